@@ -59,5 +59,76 @@ def is_key(key):
 #    (str): An sha256 hex digest of the given value
 #
 def generate_key(value):
-    ustring = ujson.dumps(value, sort_keys=True, escape_forward_slashes=False).encode("utf-8")
+    ustring = _serialize(value).encode("utf-8")
     return hashlib.sha256(ustring).hexdigest()
+
+
+# KeyBase()
+#
+# A dictionary of values shared by multiple cache keys, serialized
+# only once.
+#
+# This is useful when generating multiple keys which only differ by
+# a few values, such as the weak, strict and strong cache keys of an
+# element.
+#
+# Args:
+#    value (dict): The values shared by the generated keys
+#
+class KeyBase:
+    def __init__(self, value):
+        self._items = {key: _serialize_item(key, item) for key, item in value.items()}
+
+    # generate_key()
+    #
+    # Generate an sha256 hex digest from the shared values, extended
+    # with the given values.
+    #
+    # This is equivalent to calling generate_key() with a dictionary
+    # holding both the shared and the given values.
+    #
+    # Args:
+    #    value (dict): The values to add to the shared values
+    #
+    # Returns:
+    #    (str): An sha256 hex digest of the combined values
+    #
+    def generate_key(self, value):
+        items = self._items.copy()
+        for key, item in value.items():
+            items[key] = _serialize_item(key, item)
+
+        h = hashlib.sha256(b"{")
+        h.update(",".join([items[key] for key in sorted(items)]).encode("utf-8"))
+        h.update(b"}")
+        return h.hexdigest()
+
+
+# _serialize()
+#
+# Serialize a value for cache key generation
+#
+# Args:
+#    value: A value to serialize
+#
+# Returns:
+#    (str): The serialized value
+#
+def _serialize(value):
+    return ujson.dumps(value, sort_keys=True, escape_forward_slashes=False)
+
+
+# _serialize_item()
+#
+# Serialize a single key/value pair of a dictionary, exactly as
+# it is serialized as part of the whole dictionary.
+#
+# Args:
+#    key (str): The dictionary key
+#    value: The value for `key`
+#
+# Returns:
+#    (str): The serialized item
+#
+def _serialize_item(key, value):
+    return _serialize(key) + ":" + _serialize(value)
@@ -14,6 +14,7 @@
 #  Authors:
 #        Jürg Billeter <juerg.billeter@codethink.co.uk>
 
+import functools
 import itertools
 import os
 import stat
@@ -37,6 +38,9 @@ from .casremote import CASRemote, _CASBatchRead, _CASBatchUpdate, BlobNotFound
 
 _BUFFER_SIZE = 65536
 
+# Maximum number of parsed Directory objects kept in memory
+_DIRECTORY_CACHE_SIZE = 4096
+
 
 # Refresh interval for disk usage of local cache in seconds
 _CACHE_USAGE_REFRESH = 5
@@ -72,6 +76,9 @@ class CASCache:
         messenger=None
     ):
         self.casdir = os.path.join(path, "cas")
+        # The objects directory including the trailing separator, object
+        # paths are built by concatenation as objpath() is called a lot
+        self._objects_prefix = os.path.join(self.casdir, "objects", "")
         self.tmpdir = os.path.join(path, "tmp")
         os.makedirs(self.tmpdir, exist_ok=True)
 
@@ -98,6 +105,14 @@ class CASCache:
         self._default_remote = CASRemote(None, self)
         self._default_remote.init()
 
+        # The digest of the empty Directory object, once it was added
+        self._empty_directory_digest = None
+
+        # Directory objects are immutable, the same trees are loaded
+        # over and over, e.g. when staging dependencies, keep the most
+        # recently parsed ones
+        self._load_directory_cached = functools.lru_cache(maxsize=_DIRECTORY_CACHE_SIZE)(self._parse_directory)
+
     # get_cas():
     #
     # Return ContentAddressableStorage stub for buildbox-casd channel.
@@ -207,8 +222,8 @@ class CASCache:
     #     tree (Digest): The directory digest to extract
     #     can_link (bool): Whether we can create hard links in the destination
     #
-    def checkout(self, dest, tree, *, can_link=False, _fetch=True):
-        if _fetch and self._remote_cache:
+    def checkout(self, dest, tree, *, can_link=False):
+        if self._remote_cache:
             # We need the files in the local cache
             local_cas = self.get_local_cas()
 
@@ -220,14 +235,28 @@ class CASCache:
 
         os.makedirs(dest, exist_ok=True)
 
-        directory = remote_execution_pb2.Directory()
+        self._checkout_directory(dest, tree, can_link=can_link)
 
-        with open(self.objpath(tree), "rb") as f:
-            directory.ParseFromString(f.read())
+    # _checkout_directory():
+    #
+    # Checkout the specified directory digest into an existing directory,
+    # recursing into subdirectories.
+    #
+    # Args:
+    #     dest (str): The existing destination path
+    #     tree (Digest): The directory digest to extract
+    #     can_link (bool): Whether we can create hard links in the destination
+    #
+    def _checkout_directory(self, dest, tree, *, can_link):
+        directory = self.load_directory(tree)
+
+        # Entry names never contain a separator, join the destination
+        # once and prefix the names by concatenation
+        prefix = os.path.join(dest, "")
 
         for filenode in directory.files:
             # regular file, create hardlink
-            fullpath = os.path.join(dest, filenode.name)
+            fullpath = prefix + filenode.name
 
             node_properties = filenode.node_properties
             if node_properties.HasField("mtime"):
@@ -251,15 +280,27 @@ class CASCache:
                     mode |= stat.S_IXGRP
                 if mode & stat.S_IROTH:
                     mode |= stat.S_IXOTH
-                os.chmod(fullpath, mode)
+                # Hardlinked objects are often already executable from
+                # a previous checkout, only change the mode if needed
+                if mode != st.st_mode:
+                    os.chmod(fullpath, mode)
 
         for dirnode in directory.directories:
-            fullpath = os.path.join(dest, dirnode.name)
-            self.checkout(fullpath, dirnode.digest, can_link=can_link, _fetch=False)
+            fullpath = prefix + dirnode.name
+
+            # The parent exists, a single mkdir() is enough, unlike
+            # os.makedirs() which first checks for the parent
+            try:
+                os.mkdir(fullpath)
+            except FileExistsError:
+                if not os.path.isdir(fullpath):
+                    raise
+
+            self._checkout_directory(fullpath, dirnode.digest, can_link=can_link)
 
         for symlinknode in directory.symlinks:
             # symlink
-            fullpath = os.path.join(dest, symlinknode.name)
+            fullpath = prefix + symlinknode.name
             os.symlink(symlinknode.target, fullpath)
 
     # pull_tree():
@@ -296,7 +337,29 @@ class CASCache:
     #     (str): The path of the object
     #
     def objpath(self, digest):
-        return os.path.join(self.casdir, "objects", digest.hash[:2], digest.hash[2:])
+        return self._objpath_from_hash(digest.hash)
+
+    # load_directory():
+    #
+    # Load a Directory object from the local CAS.
+    #
+    # The returned object is cached and shared with all other callers
+    # loading the same digest. Callers must treat it as read-only, and
+    # must neither modify it nor any of its sub-messages, such as the
+    # digests or mtimes of its nodes. Copy it first if a modified
+    # version is needed.
+    #
+    # Args:
+    #     digest (Digest): The digest of the Directory object
+    #
+    # Returns:
+    #     (Directory): The parsed Directory protobuf object
+    #
+    # Raises:
+    #     FileNotFoundError: If the object is not in the local cache
+    #
+    def load_directory(self, digest):
+        return self._load_directory_cached(digest.hash)
 
     # open():
     #
@@ -343,6 +406,22 @@ class CASCache:
         assert len(digests) == 1
         return digests[0]
 
+    # add_empty_directory():
+    #
+    # Write the empty Directory object to CAS.
+    #
+    # Empty directories are very common when composing directory
+    # trees, so the object is only written once per session.
+    #
+    # Returns:
+    #     (Digest): The digest of the empty Directory object
+    #
+    def add_empty_directory(self):
+        if self._empty_directory_digest is None:
+            directory = remote_execution_pb2.Directory()
+            self._empty_directory_digest = self.add_object(buffer=directory.SerializeToString())
+        return self._empty_directory_digest
+
     # add_objects():
     #
     # Hash and write objects to CAS.
@@ -522,17 +601,19 @@ class CASCache:
         else:
             instance_name = ""
 
-        missing_blobs = {}
-        # Limit size of FindMissingBlobs request
-        for required_blobs_group in _grouper(iter(blobs), 512):
+        # Limit size of FindMissingBlobs request, but send all requests
+        # before waiting for any response to avoid paying a round trip
+        # per request
+        futures = []
+        for required_blobs_group in _grouper(blobs, 512):
             request = remote_execution_pb2.FindMissingBlobsRequest(instance_name=instance_name)
+            request.blob_digests.extend(required_blobs_group)
+            futures.append(cas.FindMissingBlobs.future(request))
 
-            for required_digest in required_blobs_group:
-                d = request.blob_digests.add()
-                d.CopyFrom(required_digest)
-
+        missing_blobs = {}
+        for future in futures:
             try:
-                response = cas.FindMissingBlobs(request)
+                response = future.result()
             except grpc.RpcError as e:
                 if e.code() == grpc.StatusCode.INVALID_ARGUMENT and e.details().startswith("Invalid instance name"):
                     raise CASCacheError("Unsupported buildbox-casd version: FindMissingBlobs failed") from e
@@ -550,11 +631,14 @@ class CASCache:
     # Generator that returns the Digests of all blobs in the tree specified by
     # the Digest of the toplevel Directory object.
     #
-    def required_blobs_for_directory(self, directory_digest, *, excluded_subdirs=None, _fetch_tree=True):
+    # Identical files and subdirectories are common in directory trees,
+    # each blob is only returned once.
+    #
+    def required_blobs_for_directory(self, directory_digest, *, excluded_subdirs=None):
         if not excluded_subdirs:
             excluded_subdirs = []
 
-        if self._remote_cache and _fetch_tree:
+        if self._remote_cache:
             # Ensure we have the directory protos in the local cache
             local_cas = self.get_local_cas()
 
@@ -564,21 +648,36 @@ class CASCache:
 
             local_cas.FetchTree(request)
 
-        # parse directory, and recursively add blobs
+        # parse directories, and iteratively add blobs
 
         yield directory_digest
 
-        directory = remote_execution_pb2.Directory()
-
-        with open(self.objpath(directory_digest), "rb") as f:
-            directory.ParseFromString(f.read())
-
-        for filenode in directory.files:
-            yield filenode.digest
-
-        for dirnode in directory.directories:
-            if dirnode.name not in excluded_subdirs:
-                yield from self.required_blobs_for_directory(dirnode.digest, _fetch_tree=False)
+        # Walked directories are tracked separately from yielded blobs,
+        # a file may have the same content as a Directory object, and
+        # the directory still needs to be walked in that case
+        seen_blobs = {directory_digest.hash}
+        seen_directories = {directory_digest.hash}
+        stack = [(directory_digest, excluded_subdirs)]
+        while stack:
+            digest, excluded = stack.pop()
+            directory = self.load_directory(digest)
+
+            for filenode in directory.files:
+                if filenode.digest.hash not in seen_blobs:
+                    seen_blobs.add(filenode.digest.hash)
+                    yield filenode.digest
+
+            for dirnode in directory.directories:
+                # Subdirectories are only excluded at the top level
+                if dirnode.name in excluded or dirnode.digest.hash in seen_directories:
+                    continue
+
+                seen_directories.add(dirnode.digest.hash)
+                stack.append((dirnode.digest, ()))
+
+                if dirnode.digest.hash not in seen_blobs:
+                    seen_blobs.add(dirnode.digest.hash)
+                    yield dirnode.digest
 
     ################################################
     #             Local Private Methods            #
@@ -596,6 +695,36 @@ class CASCache:
             os.chmod(f.name, stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
             yield f
 
+    # _objpath_from_hash():
+    #
+    # Return the path of an object based on its hash, see objpath().
+    #
+    # Args:
+    #     digest_hash (str): The hash of the object
+    #
+    # Returns:
+    #     (str): The path of the object
+    #
+    def _objpath_from_hash(self, digest_hash):
+        return self._objects_prefix + digest_hash[:2] + os.sep + digest_hash[2:]
+
+    # _parse_directory():
+    #
+    # Read and parse a Directory object, use load_directory() instead
+    # to benefit from the cache of parsed Directory objects.
+    #
+    # Args:
+    #     digest_hash (str): The hash of the Directory object
+    #
+    # Returns:
+    #     (Directory): The parsed Directory protobuf object
+    #
+    def _parse_directory(self, digest_hash):
+        directory = remote_execution_pb2.Directory()
+        with open(self._objpath_from_hash(digest_hash), "rb") as f:
+            directory.ParseFromString(f.read())
+        return directory
+
     # _fetch_directory():
     #
     # Fetches remote directory and adds it to content addressable store.
@@ -660,6 +789,8 @@ class CASCache:
     # Returns: The Digests of the blobs that were not available on the remote CAS
     #
     def fetch_blobs(self, remote, digests, *, allow_partial=False):
+        digests = _unique_digests(digests)
+
         if self._remote_cache:
             # Determine blobs missing in the remote cache and only fetch those
             digests = self.missing_blobs(digests)
@@ -696,6 +827,8 @@ class CASCache:
     #    digests (list): The Digests of Blobs to upload
     #
     def send_blobs(self, remote, digests):
+        digests = _unique_digests(digests)
+
         if self._remote_cache:
             # First fetch missing blobs from the remote cache as we can't
             # transfer blobs directly from the remote cache to another remote.
@@ -823,10 +956,15 @@ class _CASCacheUsageMonitor(threading.Thread):
                 time.sleep(0.1)
 
 
+# Returns the given digests as a list, without duplicates
+def _unique_digests(digests):
+    return list({digest.hash: digest for digest in digests}.values())
+
+
 def _grouper(iterable, n):
+    iterator = iter(iterable)
     while True:
-        try:
-            current = next(iterable)
-        except StopIteration:
+        group = list(itertools.islice(iterator, n))
+        if not group:
             return
-        yield itertools.chain([current], itertools.islice(iterable, n - 1))
+        yield group
@@ -127,8 +127,12 @@ class _CASBatchRead:
 
         local_cas = self._remote.cascache.get_local_cas()
 
-        for request in self._requests:
-            batch_response = local_cas.FetchMissingBlobs(request)
+        # Send all requests before waiting for any response, so that
+        # buildbox-casd can fetch the batches concurrently
+        futures = [local_cas.FetchMissingBlobs.future(request) for request in self._requests]
+
+        for future in futures:
+            batch_response = future.result()
 
             for response in batch_response.responses:
                 if response.status.code == code_pb2.NOT_FOUND:
@@ -181,8 +185,12 @@ class _CASBatchUpdate:
 
         local_cas = self._remote.cascache.get_local_cas()
 
-        for request in self._requests:
-            batch_response = local_cas.UploadMissingBlobs(request)
+        # Send all requests before waiting for any response, so that
+        # buildbox-casd can upload the batches concurrently
+        futures = [local_cas.UploadMissingBlobs.future(request) for request in self._requests]
+
+        for future in futures:
+            batch_response = future.result()
 
             for response in batch_response.responses:
                 if response.status.code != code_pb2.OK:
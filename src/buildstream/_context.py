@@ -222,6 +222,9 @@ class Context:
         self._workspace_project_cache: WorkspaceProjectCache = WorkspaceProjectCache()
         self._cascache: Optional[CASCache] = None
 
+        # Source mirror directories which were already created, by source kind
+        self._source_mirror_directories: Dict[str, str] = {}
+
     # __enter__()
     #
     # Called when entering the with-statement context.
@@ -673,6 +676,28 @@ class Context:
         # value which we cache here too.
         return self._strict_build_plan
 
+    # get_source_mirror_directory():
+    #
+    # Fetch the directory where sources of the given kind store
+    # their mirrors, ensuring that it exists.
+    #
+    # The directory is only created once per invocation, instead
+    # of once for every source instance of the given kind.
+    #
+    # Args:
+    #    kind: The source kind
+    #
+    # Returns:
+    #    The mirror directory for the given source kind
+    #
+    def get_source_mirror_directory(self, kind: str) -> str:
+        directory = self._source_mirror_directories.get(kind)
+        if directory is None:
+            directory = os.path.join(self.sourcedir, kind)
+            os.makedirs(directory, exist_ok=True)
+            self._source_mirror_directories[kind] = directory
+        return directory
+
     def get_cascache(self) -> CASCache:
         if self._cascache is None:
             if self.log_debug:
@@ -32,13 +32,22 @@ import os
 import urllib.request
 import urllib.error
 import contextlib
-import shutil
+import functools
+import hashlib
 import netrc
 
 from .source import Source, SourceError
 from . import utils
 
 
+# The size of the chunks read from the network response while downloading
+_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Mirror clones of a source, and sources downloading the same url,
+# all share the same url specific mirror directory name.
+_url_directory_name = functools.lru_cache(maxsize=4096)(utils.url_directory_name)
+
+
 class _NetrcFTPOpener(urllib.request.FTPHandler):
     def __init__(self, netrc_config):
         self.netrc = netrc_config
@@ -101,33 +110,40 @@ def _download_file(opener_creator, url, etag, directory):
     try:
         with contextlib.closing(opener.open(request)) as response:
             info = response.info()
+            new_etag = info.get("ETag")
 
             # some servers don't honor the 'If-None-Match' header
-            if etag and info["ETag"] == etag:
-                return None, None, None
+            if etag and new_etag == etag:
+                return None, None, None, None
 
-            etag = info["ETag"]
+            etag = new_etag
 
             filename = info.get_filename(default_name)
             filename = os.path.basename(filename)
             local_file = os.path.join(directory, filename)
+
+            # Compute the sha256sum while writing the file, this
+            # saves us from reading the whole file back again.
+            h = hashlib.sha256()
             with open(local_file, "wb") as dest:
-                shutil.copyfileobj(response, dest)
+                for chunk in iter(lambda: response.read(_DOWNLOAD_CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    dest.write(chunk)
 
     except urllib.error.HTTPError as e:
         if e.code == 304:
             # 304 Not Modified.
             # Because we use etag only for matching ref, currently specified ref is what
             # we would have downloaded.
-            return None, None, None
+            return None, None, None, None
 
-        return None, None, str(e)
+        return None, None, None, str(e)
     except (urllib.error.URLError, urllib.error.ContentTooShortError, OSError, ValueError) as e:
         # Note that urllib.request.Request in the try block may throw a
         # ValueError for unknown url types, so we handle it here.
-        return None, None, str(e)
+        return None, None, None, str(e)
 
-    return local_file, etag, None
+    return local_file, etag, h.hexdigest(), None
 
 
 class DownloadableFileSource(Source):
@@ -141,7 +157,7 @@ class DownloadableFileSource(Source):
         self.original_url = node.get_str("url")
         self.ref = node.get_str("ref", None)
         self.url = self.translate_url(self.original_url)
-        self._mirror_dir = os.path.join(self.get_mirror_directory(), utils.url_directory_name(self.original_url))
+        self._mirror_dir = os.path.join(self.get_mirror_directory(), _url_directory_name(self.original_url))
 
     def preflight(self):
         return
@@ -154,12 +170,14 @@ class DownloadableFileSource(Source):
 
     def load_ref(self, node):
         self.ref = node.get_str("ref", None)
+        self.__default_mirror_file = None
 
     def get_ref(self):
         return self.ref
 
     def set_ref(self, ref, node):
         node["ref"] = self.ref = ref
+        self.__default_mirror_file = None
 
     def track(self):  # pylint: disable=arguments-differ
         # there is no 'track' field in the source to determine what/whether
@@ -224,7 +242,7 @@ class DownloadableFileSource(Source):
 
             url_opener_creator = _UrlOpenerCreator(self._parse_netrc())
 
-            local_file, new_etag, error = self.blocking_activity(
+            local_file, new_etag, sha256, error = self.blocking_activity(
                 _download_file, (url_opener_creator, self.url, etag, td), activity_name
             )
 
@@ -235,14 +253,12 @@ class DownloadableFileSource(Source):
                 return self.ref
 
             # Make sure url-specific mirror dir exists.
-            if not os.path.isdir(self._mirror_dir):
-                os.makedirs(self._mirror_dir)
+            os.makedirs(self._mirror_dir, exist_ok=True)
 
-            # Store by sha256sum
-            sha256 = utils.sha256sum(local_file)
+            # Store by the sha256sum computed during the download.
             # Even if the file already exists, move the new file over.
             # In case the old file was corrupted somehow.
-            os.rename(local_file, self._get_mirror_file(sha256))
+            os.replace(local_file, self._get_mirror_file(sha256))
 
             if new_etag:
                 self._store_etag(sha256, new_etag)
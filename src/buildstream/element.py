@@ -215,7 +215,7 @@ class Element(Plugin):
         artifact_key: str = None,
     ):
 
-        self.__cache_key_dict = None  # Dict for cache key calculation
+        self.__cache_key_base = None  # Shared base for cache key calculation
         self.__cache_key: Optional[str] = None  # Our cached cache key
 
         super().__init__(load_element.name, context, project, load_element.node, "element")
@@ -2235,11 +2235,11 @@ class Element(Plugin):
         if any(not all(dep) for dep in dependencies):
             return None
 
-        # Generate dict that is used as base for all cache keys
-        if self.__cache_key_dict is None:
+        # Generate the base which is shared by all cache keys
+        if self.__cache_key_base is None:
             project = self._get_project()
 
-            self.__cache_key_dict = {
+            cache_key_dict = {
                 "core-artifact-version": BST_CORE_ARTIFACT_VERSION,
                 "element-base-key": self.__get_base_key(),
                 "element-plugin-key": self.get_unique_key(),
@@ -2248,22 +2248,24 @@ class Element(Plugin):
                 "public": self.__public.strip_node_info(),
             }
 
-            self.__cache_key_dict["sources"] = self.__sources.get_unique_key()
-            self.__cache_key_dict["fatal-warnings"] = sorted(project._fatal_warnings)
+            cache_key_dict["sources"] = self.__sources.get_unique_key()
+            cache_key_dict["fatal-warnings"] = sorted(project._fatal_warnings)
 
             # Calculate sandbox related factors if this element runs the sandbox at assemble time.
             if self.BST_RUN_COMMANDS:
                 # Filter out nocache variables from the element's environment
                 cache_env = {key: value for key, value in self.__environment.items() if key not in self.__env_nocache}
-                self.__cache_key_dict["sandbox"] = self.__sandbox_config.to_dict()
-                self.__cache_key_dict["environment"] = cache_env
+                cache_key_dict["sandbox"] = self.__sandbox_config.to_dict()
+                cache_key_dict["environment"] = cache_env
 
-        cache_key_dict = self.__cache_key_dict.copy()
-        cache_key_dict["dependencies"] = dependencies
+            # The base is serialized only once, instead of once for each cache key
+            self.__cache_key_base = _cachekey.KeyBase(cache_key_dict)
+
+        cache_key_dict = {"dependencies": dependencies}
         if weak_cache_key is not None:
             cache_key_dict["weak-cache-key"] = weak_cache_key
 
-        return _cachekey.generate_key(cache_key_dict)
+        return self.__cache_key_base.generate_key(cache_key_dict)
 
     # _cached_sources()
     #
@@ -3255,12 +3257,19 @@ class Element(Plugin):
         context = self._get_context()
 
         # Calculate the strict cache key
-        dependencies = [[e.project_name, e.name, e.__strict_cache_key] for e in self._dependencies(_Scope.BUILD)]
+        dependencies = []
+        for e in self._dependencies(_Scope.BUILD):
+            if e.__strict_cache_key is None:
+                # Cache keys cannot be calculated yet as a build dependency doesn't
+                # have a cache key yet, don't bother collecting the remaining ones.
+                return
+            dependencies.append([e.project_name, e.name, e.__strict_cache_key])
+
         self.__strict_cache_key = self._calculate_cache_key(dependencies, self.__weak_cache_key)
 
         if self.__strict_cache_key is None:
-            # Cache keys cannot be calculated yet as a build dependency doesn't
-            # have a cache key yet.
+            # Cache keys cannot be calculated yet as information for the
+            # cache key is missing.
             return
 
         # As the strict cache key has already been calculated, it should always
@@ -327,6 +327,7 @@ class Plugin:
         self.__project = project  # The Project object
 
         self.__provenance_node = provenance_node  # The originating YAML node
+        self.__provenance = None  # The provenance of the originating YAML node, computed lazily
         self.__type_tag = type_tag  # The type of plugin (element or source)
         self.__configuring = False  # Whether we are currently configuring
 
@@ -339,7 +340,12 @@ class Plugin:
         # Infer the kind identifier
         modulename = type(self).__module__
         self.__kind = modulename.rsplit(".", maxsplit=1)[-1]
-        self.debug("Created: {}".format(self))
+
+        # The string representation, computed lazily
+        self.__str = None  # type: Optional[str]
+
+        if self.__context.log_debug:
+            self.debug("Created: {}".format(self))
 
     def __del__(self):
         # Dont send anything through the Message() pipeline at destruction time,
@@ -348,9 +354,12 @@ class Plugin:
             sys.stderr.write("DEBUG: Destroyed: {}\n".format(self))
 
     def __str__(self):
-        return "{kind} {typetag} at {provenance}".format(
-            kind=self.__kind, typetag=self.__type_tag, provenance=self._get_provenance()
-        )
+        # The kind, type tag and provenance never change, compute this only once
+        if self.__str is None:
+            self.__str = "{kind} {typetag} at {provenance}".format(
+                kind=self.__kind, typetag=self.__type_tag, provenance=self._get_provenance()
+            )
+        return self.__str
 
     #############################################################
     #                      Abstract Methods                     #
@@ -855,7 +864,9 @@ class Plugin:
     # Fetch bst file, line and column of the entity
     #
     def _get_provenance(self):
-        return self.__provenance_node.get_provenance()
+        if self.__provenance is None:
+            self.__provenance = self.__provenance_node.get_provenance()
+        return self.__provenance
 
     # Context manager for getting the open file handle to this
     # plugin's log. Used in the child context to add stuff to
@@ -215,7 +215,6 @@ Class Reference
 ---------------
 """
 
-import os
 from contextlib import contextmanager
 from typing import Iterable, Iterator, Optional, Tuple, TYPE_CHECKING
 
@@ -679,11 +678,9 @@ class Source(Plugin):
            The directory belonging to this source
         """
         if self.__mirror_directory is None:
-            # Create the directory if it doesnt exist
+            # The context creates the directory if it doesnt exist
             context = self._get_context()
-            directory = os.path.join(context.sourcedir, self.get_kind())
-            os.makedirs(directory, exist_ok=True)
-            self.__mirror_directory = directory
+            self.__mirror_directory = context.get_source_mirror_directory(self.get_kind())
 
         return self.__mirror_directory
 
@@ -1083,6 +1080,10 @@ class Source(Plugin):
         self.set_ref(new_ref, modify)
         to_modify = modify.strip_node_info()
 
+        # The cached state depends on the ref, ensure it
+        # gets recomputed the next time it is needed
+        self.__is_cached = None
+
         # FIXME: this will save things too often, as a ref might not have
         #        changed. We should optimize this to detect it differently
         if not save:
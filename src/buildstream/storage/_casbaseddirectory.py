@@ -17,6 +17,7 @@
 
 import os
 import stat
+import sys
 import tarfile as tarfilelib
 from tarfile import TarFile
 from contextlib import contextmanager
@@ -37,6 +38,10 @@ from ..utils import FileListResult, BST_ARBITRARY_TIMESTAMP
 # An object to represent a file, used to track members of a CasBasedDirectory
 #
 class _IndexEntry:
+    # Index entries are instantiated for every member of every loaded
+    # directory, avoid a per instance __dict__
+    __slots__ = ["cas_cache", "name", "type", "digest", "target", "is_executable", "directory", "mtime"]
+
     def __init__(
         self,
         cas_cache: CASCache,
@@ -146,6 +151,12 @@ class CasBasedDirectory(Directory):
         # The parent directory
         self.__parent: Optional["CasBasedDirectory"] = parent
 
+        # The path of this directory from the root, computed on demand.
+        # The name and parent of a directory object never change, rename()
+        # moves a directory by adding a clone of its entry, which creates
+        # a new object with its own identifier.
+        self.__identifier: Optional[str] = None
+
         # An index of directory entries
         self.__index: Dict[str, _IndexEntry] = {}
 
@@ -453,8 +464,9 @@ class CasBasedDirectory(Directory):
     # Sets this directory as read only
     #
     def _set_subtree_read_only(self, read_only: bool) -> None:
-        self.__subtree_read_only = read_only
-        self.__invalidate_digest()
+        if read_only != self.__subtree_read_only:
+            self.__subtree_read_only = read_only
+            self.__invalidate_digest()
 
     # _apply_changes():
     #
@@ -520,11 +532,11 @@ class CasBasedDirectory(Directory):
 
         # We can't iterate and remove entries at the same time
         to_remove = [entry for entry in dir_a.__index.values() if entry.name not in dir_b.__index]
+        # Added and removed entries invalidate the digest, it is
+        # kept when no change needed to be applied.
         for entry in to_remove:
             self.remove(entry.name, recursive=True)
 
-        self.__invalidate_digest()
-
     #############################################################
     #                      Private methods                      #
     #############################################################
@@ -540,6 +552,10 @@ class CasBasedDirectory(Directory):
     # by the private _IndexEntry class
     #
     def _get_digest(self):
+        if not self.__digest and not self.__index and self.__subtree_read_only is None:
+            # All empty directories share the same digest
+            self.__digest = self.__cas_cache.add_empty_directory()
+
         if not self.__digest:
             # Create updated Directory proto
             pb2_directory = remote_execution_pb2.Directory()
@@ -551,28 +567,23 @@ class CasBasedDirectory(Directory):
 
             for name, entry in sorted(self.__index.items()):
                 if entry.type == FileType.DIRECTORY:
-                    dirnode = pb2_directory.directories.add()
-                    dirnode.name = name
-
                     # Update digests for subdirectories in DirectoryNodes.
                     # No need to call entry.get_directory().
                     # If it hasn't been instantiated, digest must be up-to-date.
                     subdir = entry.directory
                     if subdir is not None:
-                        dirnode.digest.CopyFrom(subdir._get_digest())
+                        digest = subdir._get_digest()
                     else:
-                        dirnode.digest.CopyFrom(entry.digest)
+                        digest = entry.digest
+                    pb2_directory.directories.add(name=name, digest=digest)
                 elif entry.type == FileType.REGULAR_FILE:
-                    filenode = pb2_directory.files.add()
-                    filenode.name = name
-                    filenode.digest.CopyFrom(entry.digest)
-                    filenode.is_executable = entry.is_executable
+                    filenode = pb2_directory.files.add(
+                        name=name, digest=entry.digest, is_executable=entry.is_executable
+                    )
                     if entry.mtime is not None:
                         filenode.node_properties.mtime.CopyFrom(entry.mtime)
                 elif entry.type == FileType.SYMLINK:
-                    symlinknode = pb2_directory.symlinks.add()
-                    symlinknode.name = name
-                    symlinknode.target = entry.target
+                    pb2_directory.symlinks.add(name=name, target=entry.target)
 
             self.__digest = self.__cas_cache.add_object(buffer=pb2_directory.SerializeToString())
 
@@ -604,7 +615,7 @@ class CasBasedDirectory(Directory):
                 elif follow_symlinks and entry.type == FileType.SYMLINK:
                     assert entry.target is not None
                     linklocation = entry.target
-                    newpaths = linklocation.split(os.path.sep)
+                    newpaths = linklocation.split("/")
                     if os.path.isabs(linklocation):
                         current_dir = current_dir.__find_root().__open_directory(newpaths, follow_symlinks=True)
                     else:
@@ -639,9 +650,7 @@ class CasBasedDirectory(Directory):
     #
     def __populate_index(self, digest) -> None:
         try:
-            pb2_directory = remote_execution_pb2.Directory()
-            with open(self.__cas_cache.objpath(digest), "rb") as f:
-                pb2_directory.ParseFromString(f.read())
+            pb2_directory = self.__cas_cache.load_directory(digest)
         except FileNotFoundError as e:
             raise DirectoryError("Directory not found in local cache: {}".format(e)) from e
 
@@ -649,26 +658,30 @@ class CasBasedDirectory(Directory):
             if prop.name == "SubtreeReadOnly":
                 self.__subtree_read_only = prop.value == "true"
 
+        # Names parsed from the proto are fresh strings, the same names
+        # are repeated throughout trees, intern them to share the strings
+        # and speed up index lookups.
         for entry in pb2_directory.directories:
-            self.__index[entry.name] = _IndexEntry(
-                self.__cas_cache, entry.name, FileType.DIRECTORY, digest=entry.digest
-            )
+            name = sys.intern(entry.name)
+            self.__index[name] = _IndexEntry(self.__cas_cache, name, FileType.DIRECTORY, digest=entry.digest)
         for entry in pb2_directory.files:
             if entry.node_properties.HasField("mtime"):
                 mtime = entry.node_properties.mtime
             else:
                 mtime = None
 
-            self.__index[entry.name] = _IndexEntry(
+            name = sys.intern(entry.name)
+            self.__index[name] = _IndexEntry(
                 self.__cas_cache,
-                entry.name,
+                name,
                 FileType.REGULAR_FILE,
                 digest=entry.digest,
                 is_executable=entry.is_executable,
                 mtime=mtime,
             )
         for entry in pb2_directory.symlinks:
-            self.__index[entry.name] = _IndexEntry(self.__cas_cache, entry.name, FileType.SYMLINK, target=entry.target)
+            name = sys.intern(entry.name)
+            self.__index[name] = _IndexEntry(self.__cas_cache, name, FileType.SYMLINK, target=entry.target)
 
     def __add_directory(self, name: str) -> "CasBasedDirectory":
         assert name not in self.__index
@@ -760,9 +773,12 @@ class CasBasedDirectory(Directory):
         if origin is None:
             origin = self
 
+        # Names never contain a separator, prefix them without os.path.join()
+        prefix = path_prefix + "/" if path_prefix else ""
+
         for name, entry in source_directory.__index.items():
             # The destination filename, relative to the root where the import started
-            relative_pathname = os.path.join(path_prefix, name)
+            relative_pathname = prefix + name
 
             is_dir = entry.type == FileType.DIRECTORY
 
@@ -780,31 +796,39 @@ class CasBasedDirectory(Directory):
 
                     # However, we still need to iterate over the directory entries
                     # to fill in `result.files_written`.
-
-                    # Use source subdirectory object if it already exists,
-                    # otherwise create object for destination subdirectory.
-                    # This is based on the assumption that the destination
-                    # subdirectory is more likely to be modified later on
-                    # (e.g., by further import_files() calls).
-                    if entry.directory is not None:
-                        subdir = entry.directory
-                    else:
-                        subdir = dest_entry.get_directory(self)
-
+                    #
+                    # If no result is collected, the subdirectory is not loaded
+                    # at all until it is actually accessed.
                     if result is not None:
+                        # Use source subdirectory object if it already exists,
+                        # otherwise create object for destination subdirectory.
+                        # This is based on the assumption that the destination
+                        # subdirectory is more likely to be modified later on
+                        # (e.g., by further import_files() calls).
+                        if entry.directory is not None:
+                            subdir = entry.directory
+                        else:
+                            subdir = dest_entry.get_directory(self)
+
                         subdir.__add_files_to_result(path_prefix=relative_pathname, result=result)
                 else:
-                    src_subdir = source_directory.open_directory(name)
+                    # Use the entries directly instead of resolving the
+                    # subdirectories by path again.
+                    src_subdir = entry.get_directory(source_directory)
                     if src_subdir == origin:
                         continue
 
-                    try:
-                        dest_subdir = self.open_directory(name, create=create_subdir)
-                    except DirectoryError:
-                        filetype = self.__index[name].type
-                        raise DirectoryError(
-                            "Destination is a {}, not a directory: /{}".format(filetype, relative_pathname)
-                        )
+                    if create_subdir:
+                        dest_subdir = self.__add_directory(name)
+                    else:
+                        existing_entry = self.__index[name]
+                        if existing_entry.type != FileType.DIRECTORY:
+                            raise DirectoryError(
+                                "Destination is a {}, not a directory: /{}".format(
+                                    existing_entry.type, relative_pathname
+                                )
+                            )
+                        dest_subdir = existing_entry.get_directory(self)
 
                     dest_subdir.__partial_import_cas_into_cas(
                         src_subdir, filter_callback, path_prefix=relative_pathname, origin=origin, result=result
@@ -819,7 +843,13 @@ class CasBasedDirectory(Directory):
                 continue
 
             if not is_dir:
-                if self.__check_replacement(name, relative_pathname, result):
+                if self.__contains_entry(entry):
+                    # An identical entry already exists, leave the index untouched
+                    # to avoid invalidating the digests up to the root.
+                    if result is not None:
+                        result.overwritten.append(relative_pathname)
+                        result.files_written.append(relative_pathname)
+                elif self.__check_replacement(name, relative_pathname, result):
                     if entry.type == FileType.REGULAR_FILE:
                         self.__add_entry(entry)
                     else:
@@ -832,36 +862,44 @@ class CasBasedDirectory(Directory):
     #
     # Provide a list of all relative paths.
     #
-    # Args:
-    #    prefix: an optional prefix to the relative paths, this is
-    #    also emitted by itself.
+    # The tree is walked with an explicit stack of directories rather
+    # than with nested generators, which would pass every path through
+    # one generator frame per directory level.
     #
     # Yields:
-    #    ist of all files with relative paths.
+    #    All files and directories with relative paths, directories
+    #    prefixing their contents.
     #
-    def __list_prefixed_relative_paths(self, prefix: str = "") -> Iterator[str]:
-        file_list = list(filter(lambda i: i[1].type != FileType.DIRECTORY, self.__index.items()))
-        directory_list = filter(lambda i: i[1].type == FileType.DIRECTORY, self.__index.items())
+    def __list_prefixed_relative_paths(self) -> Iterator[str]:
+        stack = [("", self)]
+        while stack:
+            prefix, directory = stack.pop()
 
-        if prefix != "":
-            yield prefix
+            if prefix:
+                yield prefix
+                prefix += "/"
 
-        for (k, v) in sorted(file_list):
-            yield os.path.join(prefix, k)
+            subdirs = []
+            for name, entry in sorted(directory.__index.items()):
+                if entry.type == FileType.DIRECTORY:
+                    subdirs.append((prefix + name, entry.get_directory(directory)))
+                else:
+                    yield prefix + name
 
-        for (k, v) in sorted(directory_list):
-            subdir = v.get_directory(self)
-            yield from subdir.__list_prefixed_relative_paths(prefix=os.path.join(prefix, k))
+            # Push in reverse order so subdirectories are listed in sorted order
+            stack.extend(reversed(subdirs))
 
     def __get_identifier(self) -> str:
-        path = ""
-        if self.__parent:
-            path = self.__parent.__get_identifier()
-        if self.__filename:
-            path += "/" + self.__filename
-        else:
-            path += "/"
-        return path
+        if self.__identifier is None:
+            path = ""
+            if self.__parent:
+                path = self.__parent.__get_identifier()
+            if self.__filename:
+                path += "/" + self.__filename
+            else:
+                path += "/"
+            self.__identifier = path
+        return self.__identifier
 
     def __find_root(self) -> "CasBasedDirectory":
         if self.__parent:
@@ -892,12 +930,15 @@ class CasBasedDirectory(Directory):
                 self.__parent.__invalidate_digest()
 
     def __add_files_to_result(self, *, path_prefix: str, result: FileListResult) -> None:
+        # Names never contain a separator, prefix them without os.path.join()
+        prefix = path_prefix + "/" if path_prefix else ""
+
         for name, entry in self.__index.items():
             # The destination filename, relative to the root where the import started
-            relative_pathname = os.path.join(path_prefix, name)
+            relative_pathname = prefix + name
 
             if entry.type == FileType.DIRECTORY:
-                subdir = self.open_directory(name)
+                subdir = entry.get_directory(self)
                 subdir.__add_files_to_result(path_prefix=relative_pathname, result=result)
             else:
                 result.files_written.append(relative_pathname)
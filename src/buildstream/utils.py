@@ -74,6 +74,10 @@ os.umask(_UMASK)
 # it might not work
 _USE_CP_FILE_RANGE = hasattr(os, "copy_file_range")
 
+# hashlib.file_digest() is only available from python 3.11, it hashes
+# files in C without going through python level read loops
+_USE_FILE_DIGEST = hasattr(hashlib, "file_digest")
+
 
 class UtilError(BstError):
     """Raised by utility functions when system calls fail.
@@ -350,10 +354,15 @@ def sha256sum(filename: str) -> str:
                   or reading `filename`
     """
     try:
-        h = hashlib.sha256()
         with open(filename, "rb") as f:
-            for chunk in iter(lambda: f.read(65536), b""):
-                h.update(chunk)
+            if _USE_FILE_DIGEST:
+                h = hashlib.file_digest(f, "sha256")
+            else:
+                h = hashlib.sha256()
+                buf = bytearray(65536)
+                view = memoryview(buf)
+                for size in iter(lambda: f.readinto(buf), 0):
+                    h.update(view[:size])
 
     except OSError as e:
         raise UtilError("Failed to get a checksum of file '{}': {}".format(filename, e)) from e
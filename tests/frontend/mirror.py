@@ -164,6 +164,16 @@ def generate_project(mirror_config=MirrorConfig.DEFAULT_MIRRORS, base_alias_succ
     return project
 
 
+# Writes the project.conf and the fetch_source element, returns the element name
+def write_project(project_dir, project, output_file):
+    element_dir = os.path.join(project_dir, "elements")
+    os.makedirs(element_dir, exist_ok=True)
+    element_name = "test.bst"
+    _yaml.roundtrip_dump(generate_element(output_file), os.path.join(element_dir, element_name))
+    _yaml.roundtrip_dump(project, os.path.join(project_dir, "project.conf"))
+    return element_name
+
+
 @pytest.mark.datafiles(DATA_DIR)
 @pytest.mark.parametrize("ref_storage", [("inline"), ("project.refs")])
 @pytest.mark.parametrize("mirror", [("no-mirror"), ("mirror"), ("unrelated-mirror")])
@@ -245,16 +255,7 @@ def test_mirror_fetch_ref_storage(cli, tmpdir, datafiles, ref_storage, mirror):
 def test_mirror_fetch_multi(cli, tmpdir, project_config, user_config, expect_success):
     output_file = os.path.join(str(tmpdir), "output.txt")
     project_dir = str(tmpdir)
-    element_dir = os.path.join(project_dir, "elements")
-    os.makedirs(element_dir, exist_ok=True)
-    element_name = "test.bst"
-    element_path = os.path.join(element_dir, element_name)
-    element = generate_element(output_file)
-    _yaml.roundtrip_dump(element, element_path)
-
-    project_file = os.path.join(project_dir, "project.conf")
-    project = generate_project(project_config)
-    _yaml.roundtrip_dump(project, project_file)
+    element_name = write_project(project_dir, generate_project(project_config), output_file)
 
     if user_config == MirrorConfig.SUCCESS_MIRRORS:
         cli.configure({"projects": {"test": {"mirrors": SUCCESS_MIRROR_LIST}}})
@@ -321,16 +322,7 @@ def test_mirror_fetch_multi(cli, tmpdir, project_config, user_config, expect_suc
 def test_mirror_fetch_source(cli, tmpdir, project_config, user_config, alias_success, expect_success, source):
     output_file = os.path.join(str(tmpdir), "output.txt")
     project_dir = str(tmpdir)
-    element_dir = os.path.join(project_dir, "elements")
-    os.makedirs(element_dir, exist_ok=True)
-    element_name = "test.bst"
-    element_path = os.path.join(element_dir, element_name)
-    element = generate_element(output_file)
-    _yaml.roundtrip_dump(element, element_path)
-
-    project_file = os.path.join(project_dir, "project.conf")
-    project = generate_project(project_config, alias_success)
-    _yaml.roundtrip_dump(project, project_file)
+    element_name = write_project(project_dir, generate_project(project_config, alias_success), output_file)
 
     # Configure the fetch source
     cli.configure({"fetch": {"source": source}})
@@ -358,16 +350,7 @@ def test_mirror_fetch_source(cli, tmpdir, project_config, user_config, alias_suc
 def test_mirror_fetch_default_cmdline(cli, tmpdir):
     output_file = os.path.join(str(tmpdir), "output.txt")
     project_dir = str(tmpdir)
-    element_dir = os.path.join(project_dir, "elements")
-    os.makedirs(element_dir, exist_ok=True)
-    element_name = "test.bst"
-    element_path = os.path.join(element_dir, element_name)
-    element = generate_element(output_file)
-    _yaml.roundtrip_dump(element, element_path)
-
-    project_file = os.path.join(project_dir, "project.conf")
-    project = generate_project()
-    _yaml.roundtrip_dump(project, project_file)
+    element_name = write_project(project_dir, generate_project(), output_file)
 
     result = cli.run(project=project_dir, args=["--default-mirror", "arrakis", "source", "fetch", element_name])
     result.assert_success()
@@ -389,16 +372,7 @@ def test_mirror_fetch_default_cmdline(cli, tmpdir):
 def test_mirror_fetch_default_userconfig(cli, tmpdir):
     output_file = os.path.join(str(tmpdir), "output.txt")
     project_dir = str(tmpdir)
-    element_dir = os.path.join(project_dir, "elements")
-    os.makedirs(element_dir, exist_ok=True)
-    element_name = "test.bst"
-    element_path = os.path.join(element_dir, element_name)
-    element = generate_element(output_file)
-    _yaml.roundtrip_dump(element, element_path)
-
-    project_file = os.path.join(project_dir, "project.conf")
-    project = generate_project()
-    _yaml.roundtrip_dump(project, project_file)
+    element_name = write_project(project_dir, generate_project(), output_file)
 
     userconfig = {"projects": {"test": {"default-mirror": "oz"}}}
     cli.configure(userconfig)
@@ -423,16 +397,7 @@ def test_mirror_fetch_default_userconfig(cli, tmpdir):
 def test_mirror_fetch_default_cmdline_overrides_config(cli, tmpdir):
     output_file = os.path.join(str(tmpdir), "output.txt")
     project_dir = str(tmpdir)
-    element_dir = os.path.join(project_dir, "elements")
-    os.makedirs(element_dir, exist_ok=True)
-    element_name = "test.bst"
-    element_path = os.path.join(element_dir, element_name)
-    element = generate_element(output_file)
-    _yaml.roundtrip_dump(element, element_path)
-
-    project_file = os.path.join(project_dir, "project.conf")
-    project = generate_project()
-    _yaml.roundtrip_dump(project, project_file)
+    element_name = write_project(project_dir, generate_project(), output_file)
 
     userconfig = {"projects": {"test": {"default-mirror": "oz"}}}
     cli.configure(userconfig)
@@ -739,14 +704,6 @@ def test_mirror_fallback_git_with_submodules(cli, tmpdir, datafiles):
 def test_mirror_expand_project_and_toplevel_root(cli, tmpdir):
     output_file = os.path.join(str(tmpdir), "output.txt")
     project_dir = str(tmpdir)
-    element_dir = os.path.join(project_dir, "elements")
-    os.makedirs(element_dir, exist_ok=True)
-    element_name = "test.bst"
-    element_path = os.path.join(element_dir, element_name)
-    element = generate_element(output_file)
-    _yaml.roundtrip_dump(element, element_path)
-
-    project_file = os.path.join(project_dir, "project.conf")
     project = {
         "name": "test",
         "min-version": "2.0",
@@ -780,8 +737,7 @@ def test_mirror_expand_project_and_toplevel_root(cli, tmpdir):
         ],
         "plugins": [{"origin": "local", "path": "sources", "sources": ["fetch_source"]}],
     }
-
-    _yaml.roundtrip_dump(project, project_file)
+    element_name = write_project(project_dir, project, output_file)
 
     result = cli.run(project=project_dir, args=["--default-mirror", "arrakis", "source", "fetch", element_name])
     result.assert_success()
@@ -0,0 +1,57 @@
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+#
+import pytest
+
+from buildstream._cachekey import KeyBase, generate_key
+
+
+BASE = {
+    "artifact-version": "1.1",
+    "context": {"architecture": "x86_64", "variables": {"prefix": "/usr"}},
+    "element-plugin-key": ["import", {"sources": None, "sandbox": {}}],
+    "public": {"bst": {"split-rules": {"devel": ["/usr/include/**", "/usr/lib/*.a"]}}},
+    "description": "Généré à partir de l’élément ✓",
+    "ratio": 0.1,
+    "timeout": 1e-07,
+}
+
+
+@pytest.mark.parametrize(
+    "extra",
+    [
+        {},
+        {"dependencies": ["base.bst", "💥.bst"]},
+        {"dependencies": [{"name": "base.bst", "key": "0" * 64}], "environment": {"PATH": "/usr/bin"}},
+        {"scale": -2.5e300, "weight": 3.14159, "count": 3},
+        # Values of the extra dictionary replace those of the base
+        {"ratio": 0.2, "description": "Überschrieben"},
+        # Keys sorting before and after the keys of the base
+        {"aaa": None, "zzz": True, "ÿ": "non-ASCII key"},
+    ],
+    ids=["empty", "non-ascii", "nested", "floats", "override", "sorting"],
+)
+def test_key_base_equivalent(extra):
+    assert KeyBase(BASE).generate_key(extra) == generate_key({**BASE, **extra})
+
+
+def test_key_base_reuse():
+    base = KeyBase(BASE)
+    first = {"dependencies": ["a.bst"]}
+    second = {"dependencies": ["b.bst"], "strict": False}
+
+    assert base.generate_key(first) == generate_key({**BASE, **first})
+    assert base.generate_key(second) == generate_key({**BASE, **second})
+
+    # Generating keys does not modify the shared values
+    assert base.generate_key({}) == generate_key(BASE)
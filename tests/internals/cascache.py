@@ -16,7 +16,8 @@ import time
 from unittest.mock import MagicMock
 
 from buildstream._cas.cascache import CASCache
-from buildstream._cas import casdprocessmanager
+from buildstream._cas import cascache, casdprocessmanager
+from buildstream._protos.build.bazel.remote.execution.v2 import remote_execution_pb2
 from buildstream._messenger import Messenger
 
 
@@ -134,3 +135,81 @@ def test_casd_redirects_stderr_to_file_and_rotate(tmp_path, monkeypatch):
         assert len(existing_log_files) == n_max_log_files
         assert evicted_file not in existing_log_files
         assert existing_log_files[-1].read_text() == "hello\n"
+
+
+def test_required_blobs_walks_directory_with_same_content_as_file(tmp_path):
+    cache = CASCache(str(tmp_path.joinpath("cas")), log_directory=str(tmp_path.joinpath("logs")))
+    try:
+        source = tmp_path.joinpath("source")
+        source.joinpath("sub").mkdir(parents=True)
+        source.joinpath("sub", "real").write_text("real")
+        sub_digest = cache.import_directory(str(source.joinpath("sub")))
+        real_digest = cache.add_object(path=str(source.joinpath("sub", "real")))
+
+        # A file with the same content as the Directory object of "sub"
+        with open(cache.objpath(sub_digest), "rb") as f:
+            source.joinpath("copy-of-dir-object").write_bytes(f.read())
+
+        root_digest = cache.import_directory(str(source))
+        blobs = [digest.hash for digest in cache.required_blobs_for_directory(root_digest)]
+
+        # The subdirectory is walked although its digest was already yielded for the file
+        assert real_digest.hash in blobs
+        assert sub_digest.hash in blobs
+        assert len(blobs) == len(set(blobs))
+    finally:
+        cache.release_resources()
+
+
+# Returns a blob batch class which records the hashes of the digests
+# added to it in `added`, instead of sending them to casd
+def _recording_batch(added):
+    class _RecordingBatch:
+        def __init__(self, remote):
+            pass
+
+        def add(self, digest):
+            added.append(digest.hash)
+
+        def send(self, *, missing_blobs=None):
+            pass
+
+    return _RecordingBatch
+
+
+def _digest(blob_hash):
+    return remote_execution_pb2.Digest(hash=blob_hash, size_bytes=1)
+
+
+def test_send_blobs_generator_with_remote_cache(tmp_path, monkeypatch):
+    uploaded = []
+    monkeypatch.setattr(cascache, "_CASBatchRead", _recording_batch([]))
+    monkeypatch.setattr(cascache, "_CASBatchUpdate", _recording_batch(uploaded))
+
+    # Consume the digests like the FindMissingBlobs requests would, report nothing missing
+    def missing_blobs(digests, *, remote=None):
+        list(digests)
+        return []
+
+    cache = CASCache(str(tmp_path), casd=False)
+    cache._remote_cache = True
+    monkeypatch.setattr(cache, "missing_blobs", missing_blobs)
+
+    cache.send_blobs(MagicMock(), (_digest(h) for h in ["a", "b"]))
+
+    assert uploaded == ["a", "b"]
+
+
+def test_fetch_and_send_blobs_deduplicate(tmp_path, monkeypatch):
+    fetched = []
+    uploaded = []
+    monkeypatch.setattr(cascache, "_CASBatchRead", _recording_batch(fetched))
+    monkeypatch.setattr(cascache, "_CASBatchUpdate", _recording_batch(uploaded))
+
+    cache = CASCache(str(tmp_path), casd=False)
+
+    cache.send_blobs(MagicMock(), [_digest(h) for h in ["a", "b", "a", "c", "b"]])
+    assert uploaded == ["a", "b", "c"]
+
+    cache.fetch_blobs(MagicMock(), [_digest(h) for h in ["c", "a", "c"]])
+    assert fetched == ["c", "a"]
@@ -57,6 +57,53 @@ def test_import(tmpdir, datafiles, backend):
         assert "bin/hello" in c.list_relative_paths()
 
 
+@pytest.mark.datafiles(DATA_DIR)
+def test_import_identical(tmpdir, datafiles):
+    original = os.path.join(str(datafiles), "original")
+
+    with setup_backend(CasBasedDirectory, str(tmpdir)) as c:
+        c.import_files(original)
+        listing = list(c.list_relative_paths())
+        digest = c._get_digest()
+
+        # Importing the same files again reports them as overwritten
+        result = c.import_files(original)
+        assert "bin/bash" in result.overwritten
+        assert "bin/bash" in result.files_written
+        assert list(c.list_relative_paths()) == listing
+
+        # The identical entries are left untouched, so the digest
+        # does not need to be computed again
+        assert c._get_digest() is digest
+
+
+@pytest.mark.datafiles(DATA_DIR)
+def test_unchanged_loaded_directory(tmpdir, datafiles):
+    original = os.path.join(str(datafiles), "original")
+
+    cas_cache = CASCache(os.path.join(str(tmpdir), "cas"), log_directory=os.path.join(str(tmpdir), "logs"))
+    try:
+        c = CasBasedDirectory(cas_cache)
+        c.import_files(original)
+        digest = c._get_digest()
+
+        # Operations which leave a directory loaded from CAS unchanged
+        # keep the digest it was loaded with
+        loaded = CasBasedDirectory(cas_cache, digest=digest)
+        loaded.import_files(original)
+        assert loaded._get_digest() is digest
+
+        loaded._apply_changes(CasBasedDirectory(cas_cache), c)
+        assert loaded._get_digest() is digest
+
+        loaded._set_subtree_read_only(True)
+        digest = loaded._get_digest()
+        loaded._set_subtree_read_only(True)
+        assert loaded._get_digest() is digest
+    finally:
+        cas_cache.release_resources()
+
+
 @pytest.mark.parametrize(
     "directories",
     [
@@ -181,7 +228,7 @@ def _test_merge_dirs(
         # We need to strip some types of values, since they're more
         # than our little list comparisons can handle
         def make_info(entry, list_props=None):
-            ret = {k: v for k, v in vars(entry).items() if k not in ("directory", "cas_cache")}
+            ret = {k: getattr(entry, k) for k in entry.__slots__ if k not in ("directory", "cas_cache")}
             if entry.type == FileType.REGULAR_FILE:
                 # Only file digests make sense here (directory digests
                 # need to be re-calculated taking into account their
@@ -306,6 +353,23 @@ def test_rename(tmpdir, datafiles, backend):
         assert c.isfile("bin2/hello2")
 
 
+@pytest.mark.datafiles(DATA_DIR)
+def test_rename_identifier(tmpdir, datafiles):
+    with setup_backend(CasBasedDirectory, str(tmpdir)) as c:
+        c.import_files(os.path.join(str(datafiles), "original"))
+        c.open_directory("lib", create=True)
+
+        subdir = c.open_directory("bin")
+        assert str(subdir).endswith("/bin]")
+
+        # The moved directory is a new object, which does not reuse the
+        # identifier computed for the old location
+        c.rename("bin", "lib/bin2")
+        renamed = c.open_directory("lib/bin2")
+        assert renamed is not subdir
+        assert str(renamed) == str(c.open_directory("lib"))[:-1] + "/bin2]"
+
+
 # This is purely for error output; lists relative paths and
 # their digests so differences are human-grokkable
 def list_relative_paths(directory):
@@ -15,6 +15,7 @@
 # Pylint doesn't play well with fixtures and dependency injection from pytest
 # pylint: disable=redefined-outer-name
 
+from contextlib import contextmanager
 import os
 from shutil import copyfile
 import subprocess
@@ -24,11 +25,13 @@ import urllib.parse
 
 import pytest
 
-from buildstream import utils
+from buildstream import utils, _yaml
 from buildstream.exceptions import ErrorDomain
+from buildstream._project import Project
 from buildstream._testing import generate_project, generate_element
 from buildstream._testing import cli  # pylint: disable=unused-import
 from buildstream._testing._utils.site import HAVE_LZIP
+from tests.testutils import dummy_context
 from tests.testutils.file_server import create_file_server
 from . import list_dir_contents
 
@@ -58,6 +61,27 @@ def _assemble_tar_lz(workingdir, srcdir, dstfile):
     os.chdir(old_dir)
 
 
+# Generates an element with a tar source for a local tarball at 'ref',
+# and yields the source loaded in this process
+@contextmanager
+def _load_tar_source(tmpdir, project, ref):
+    generate_element(
+        project,
+        "target.bst",
+        {"kind": "import", "sources": [{"kind": "tar", "url": "tmpdir:/a.tar.gz", "ref": ref}]},
+    )
+
+    user_config_file = os.path.join(str(tmpdir), "buildstream.conf")
+    _yaml.roundtrip_dump({"cachedir": os.path.join(str(tmpdir), "cache")}, file=user_config_file)
+
+    with dummy_context(config=user_config_file) as context:
+        loaded_project = Project(project, context)
+        loaded_project.ensure_fully_loaded()
+
+        element = loaded_project.load_elements(["target.bst"])[0]
+        yield list(element.sources())[0]
+
+
 # Test that without ref, consistency is set appropriately.
 @pytest.mark.datafiles(os.path.join(DATA_DIR, "no-ref"))
 def test_no_ref(cli, tmpdir, datafiles):
@@ -491,3 +515,68 @@ def test_malicious_out_of_basedir_hardlinks(cli, tmpdir, datafiles):
     result.assert_success()
     result = cli.run(project=project, args=["source", "fetch", "malicious_target.bst"])
     result.assert_main_error(ErrorDomain.STREAM, None)
+
+
+# Test that after tracking a new ref, the mirror file of the new ref
+# is used, and not the one of the ref the source was loaded with
+@pytest.mark.datafiles(os.path.join(DATA_DIR, "fetch"))
+def test_track_new_ref_mirror_file(tmpdir, datafiles):
+    project = str(datafiles)
+    generate_project(project, config={"aliases": {"tmpdir": "file:///" + str(tmpdir)}})
+
+    src_tar = os.path.join(str(tmpdir), "a.tar.gz")
+    _assemble_tar(os.path.join(project, "content"), "a", src_tar)
+    old_ref = utils.sha256sum(src_tar)
+
+    with _load_tar_source(tmpdir, project, old_ref) as source:
+        source._fetch()
+        assert source.is_cached()
+
+        # Change the tarball and track it
+        _assemble_tar(os.path.join(project, "content"), "./a", src_tar)
+        new_ref = source._track()
+        assert new_ref != old_ref
+
+        # Tracking already mirrored the new ref, remove it again while
+        # the mirror file of the old ref is still there
+        new_mirror_file = os.path.join(source._mirror_dir, new_ref)
+        os.unlink(new_mirror_file)
+        assert os.path.isfile(os.path.join(source._mirror_dir, old_ref))
+
+        assert not source.is_cached()
+        source._fetch()
+        assert os.path.isfile(new_mirror_file)
+        assert source.is_cached()
+
+
+# Test that the cached state of a source is recomputed when tracking
+# changes its ref, so that the new ref gets fetched
+@pytest.mark.datafiles(os.path.join(DATA_DIR, "fetch"))
+def test_track_new_ref_cached_state(tmpdir, datafiles):
+    project = str(datafiles)
+    generate_project(project, config={"aliases": {"tmpdir": "file:///" + str(tmpdir)}})
+
+    src_tar = os.path.join(str(tmpdir), "a.tar.gz")
+    _assemble_tar(os.path.join(project, "content"), "a", src_tar)
+    old_ref = utils.sha256sum(src_tar)
+
+    with _load_tar_source(tmpdir, project, old_ref) as source:
+        source._fetch()
+        source._fetch_done(True)
+        assert source._is_cached()
+
+        # Change the tarball and track it
+        _assemble_tar(os.path.join(project, "content"), "./a", src_tar)
+        new_ref = source._track()
+        assert new_ref != old_ref
+
+        # Tracking already mirrored the new ref, remove it again
+        # so that the source for the new ref is not cached
+        new_mirror_file = os.path.join(source._mirror_dir, new_ref)
+        os.unlink(new_mirror_file)
+
+        assert not source._is_cached()
+        source._fetch()
+        source._fetch_done(True)
+        assert os.path.isfile(new_mirror_file)
+        assert source._is_cached()